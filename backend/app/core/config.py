@@ -88,13 +88,14 @@ class Settings(BaseSettings):
     OSS_ENDPOINT: str = Field(default="", description="阿里云OSS Endpoint（如：oss-cn-wuhan-lr.aliyuncs.com）")
 
     QWEN_ASR_MODEL_PATH: str = Field(default="", description="本地Qwen ASR模型路径，为空则使用默认路径")
+    ASR_PRELOAD: bool = Field(default=False, description="是否在启动时预加载ASR模型，否则仅检查配置并在首次请求时懒加载")
 
     # 阿里云 NLS 语音识别配置
     NLS_APPKEY: str = Field(default="", description="阿里云NLS语音服务AppKey")
     NLS_ACCESS_KEY_ID: str = Field(default="", description="阿里云NLS语音服务AccessKey ID")
     NLS_ACCESS_KEY_SECRET: str = Field(default="", description="阿里云NLS语音服务AccessKey Secret")
 
-    @field_validator("DEBUG", "CRAWLER_ENABLED", "CRAWLER_START_ON_STARTUP", mode="before")
+    @field_validator("DEBUG", "CRAWLER_ENABLED", "CRAWLER_START_ON_STARTUP", "ASR_PRELOAD", mode="before")
     @classmethod
     def parse_bool_like_values(cls, value):
         if isinstance(value, bool):
@@ -0,0 +1,75 @@
+"""
+纯 ASGI 实现的 CORS 中间件
+
+系统的跨域策略是静态的（允许所有来源、所有方法、所有请求头，且不携带凭证），
+因此响应头可以在启动时预先计算好，请求路径上只需做字节级的头部追加，
+不再为每个请求构造 Request/Response 对象。
+"""
+
+ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+
+
+class PureCORSMiddleware:
+    """
+    允许所有来源的 CORS 中间件
+
+    行为与 CORSMiddleware(allow_origins=["*"], allow_credentials=False,
+    allow_methods=["*"], allow_headers=["*"], expose_headers=["*"]) 保持一致：
+    - 预检请求（OPTIONS + Access-Control-Request-Method）直接返回 204
+    - 带 Origin 的普通请求在响应头中追加允许来源和暴露头
+    - 不带 Origin 的请求原样透传
+    """
+
+    def __init__(self, app, max_age: int = 600):
+        self.app = app
+        self.simple_headers = [
+            (b"access-control-allow-origin", b"*"),
+            (b"access-control-expose-headers", b"*"),
+        ]
+        self.preflight_headers = [
+            (b"access-control-allow-origin", b"*"),
+            (b"access-control-allow-methods", ALLOW_METHODS),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._send_preflight_response(send, request_headers)
+            return
+
+        simple_headers = self.simple_headers
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + simple_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def _send_preflight_response(self, send, request_headers):
+        """返回预检响应，允许的请求头直接回显客户端声明的请求头"""
+        headers = self.preflight_headers
+        if request_headers:
+            headers = headers + [(b"access-control-allow-headers", request_headers)]
+
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
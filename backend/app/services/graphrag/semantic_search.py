@@ -142,10 +142,8 @@ class EmbeddingService:
         
         try:
             # 在线程池中运行同步模型推理
-            loop = asyncio.get_event_loop()
-            embedding = await loop.run_in_executor(
-                None, 
-                lambda: model.encode(text, convert_to_numpy=True, show_progress_bar=False)
+            embedding = await asyncio.to_thread(
+                model.encode, text, convert_to_numpy=True, show_progress_bar=False
             )
             
             # 缓存结果
@@ -165,10 +163,8 @@ class EmbeddingService:
             return [None] * len(texts)
         
         try:
-            loop = asyncio.get_event_loop()
-            embeddings = await loop.run_in_executor(
-                None,
-                lambda: model.encode(texts, convert_to_numpy=True, show_progress_bar=False, batch_size=32)
+            embeddings = await asyncio.to_thread(
+                model.encode, texts, convert_to_numpy=True, show_progress_bar=False, batch_size=32
             )
             return list(embeddings)
         except Exception as e:
@@ -125,7 +125,12 @@ class LSTMTyphoonModel(nn.Module):
         lstm_out = self.layer_norm(lstm_out)
 
         # Multi-Head Attention
-        attn_out, attn_weights = self.attention(lstm_out, lstm_out, lstm_out)
+        # 不需要注意力权重时关闭 need_weights，内部走 scaled_dot_product_attention 融合内核，
+        # 不再显式构造 [batch, seq_len, seq_len] 的权重矩阵
+        attn_out, attn_weights = self.attention(
+            lstm_out, lstm_out, lstm_out,
+            need_weights=return_attention
+        )
         # attn_out: [batch, seq_len, hidden_size]
 
         # 残差连接
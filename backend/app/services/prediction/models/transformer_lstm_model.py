@@ -119,18 +119,12 @@ class TransformerLSTMModel(nn.Module):
         context = transformer_out[:, -1, :]
         
         # 多步预测（输出均值和方差）
-        predictions_mean = []
-        predictions_std = []
-        
-        for head in self.prediction_heads:
-            output = head(context)
-            mean = output[..., :4]
-            std = F.softplus(output[..., 4:]) + 1e-6  # 确保标准差为正
-            predictions_mean.append(mean)
-            predictions_std.append(std)
-        
-        predictions_mean = torch.stack(predictions_mean, dim=1)
-        predictions_std = torch.stack(predictions_std, dim=1)
+        # 各预测头输出先堆叠为 [batch, pred_steps, output_size * 2]，再一次性拆分为均值和标准差，
+        # softplus 只启动一次内核，且两个输出都是内存连续的独立张量，下游切片和归约可合并访存
+        outputs = torch.stack([head(context) for head in self.prediction_heads], dim=1)
+        predictions_mean, predictions_std = outputs.chunk(2, dim=-1)
+        predictions_mean = predictions_mean.contiguous()
+        predictions_std = F.softplus(predictions_std) + 1e-6  # 确保标准差为正
         
         # 置信度估计
         confidence = self.confidence_head(context)
@@ -1,13 +1,17 @@
 """
 FastAPI主应用入口
 """
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import orjson
 from loguru import logger
 
 from app.core.config import settings
+from app.core.cors import PureCORSMiddleware
 from app.core.database import init_db, close_db
 from app.api import typhoon, prediction, report, crawler, statistics, export, alert, ai_agent, auth, user_stats, asr, knowledge_graph
 from app.api.v1 import images, video_analysis
@@ -31,17 +35,24 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("数据库初始化完成")
 
-    # 检查 ASR 配置
-    logger.info("正在检查 ASR 语音识别配置...")
-    try:
-        from app.api.asr import get_model_path, DEFAULT_LOCAL_MODEL_PATH
+    if settings.ASR_PRELOAD:
+        # 预加载 ASR 模型，放到线程中执行以免阻塞事件循环
+        logger.info("正在预加载 ASR 语音识别模型...")
         try:
-            model_path = get_model_path()
-            logger.info(f"本地 ASR 模型已配置: {model_path}")
-        except FileNotFoundError:
-            logger.warning(f"本地 ASR 模型未找到，请下载模型到: {DEFAULT_LOCAL_MODEL_PATH}")
-    except Exception as e:
-        logger.warning(f"ASR 配置检查失败: {e}")
+            await asyncio.to_thread(asr.get_asr_model)
+        except Exception as e:
+            logger.warning(f"ASR 模型预加载失败，将在首次请求时重试: {e}")
+    else:
+        # 检查 ASR 配置
+        logger.info("正在检查 ASR 语音识别配置...")
+        try:
+            try:
+                model_path = asr.get_model_path()
+                logger.info(f"本地 ASR 模型已配置: {model_path}")
+            except FileNotFoundError:
+                logger.warning(f"本地 ASR 模型未找到，请下载模型到: {asr.DEFAULT_LOCAL_MODEL_PATH}")
+        except Exception as e:
+            logger.warning(f"ASR 配置检查失败: {e}")
 
     # 启动定时任务调度器（会自动执行启动时完整爬取）
     start_scheduler()
@@ -68,6 +79,8 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="基于FastAPI + AI大模型的智能台风分析系统",
     lifespan=lifespan,
+    # 使用 orjson 序列化响应，各路由未单独指定 response_class 时均继承此默认值
+    default_response_class=ORJSONResponse,
     # 配置 Swagger UI 使用国内可访问的 CDN
     swagger_ui_parameters={
         "syntaxHighlight.theme": "monokai",
@@ -75,54 +88,50 @@ app = FastAPI(
     },
 )
 
-# 配置CORS - 允许所有来源（开发环境）
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 允许所有来源
-    allow_credentials=False,  # 当allow_origins为*时，必须设置为False
-    allow_methods=["*"],  # 允许所有HTTP方法
-    allow_headers=["*"],  # 允许所有请求头
-    expose_headers=["*"],  # 暴露所有响应头
-)
+# 配置CORS - 允许所有来源（开发环境），纯ASGI实现，响应头启动时预先计算
+app.add_middleware(PureCORSMiddleware)
+
+# 启用GZip压缩 - 仅压缩超过1KB的响应（台风列表、统计、导出等大JSON）
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 
 # 注册路由
-app.include_router(typhoon.router, prefix="/api")
-app.include_router(prediction.router, prefix="/api")
-app.include_router(report.router, prefix="/api")
-app.include_router(crawler.router, prefix="/api")
-app.include_router(statistics.router, prefix="/api")
-app.include_router(export.router, prefix="/api")
-app.include_router(alert.router, prefix="/api")
-app.include_router(ai_agent.router, prefix="/api")
-app.include_router(auth.router, prefix="/api")
-app.include_router(user_stats.router, prefix="/api")
-app.include_router(asr.router, prefix="/api")
-app.include_router(images.router, prefix="/api")
-app.include_router(video_analysis.router, prefix="/api")
-app.include_router(knowledge_graph.router, prefix="/api")
+ROUTERS = (
+    typhoon, prediction, report, crawler, statistics, export, alert,
+    ai_agent, auth, user_stats, asr, images, video_analysis, knowledge_graph,
+)
+for module in ROUTERS:
+    app.include_router(module.router, prefix="/api")
+
+
+# 根路径和健康检查的响应内容固定，启动时预先序列化
+_ROOT_BODY = orjson.dumps({
+    "message": "台风分析系统API",
+    "version": settings.APP_VERSION,
+    "description": "基于FastAPI + AI大模型的智能台风分析系统",
+    "docs": "/docs",
+    "redoc": "/redoc",
+    "health": "/health"
+})
+
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "version": settings.APP_VERSION,
+    "service": "台风分析系统API"
+})
 
 
 @app.get("/")
 async def root():
-    return {
-        "message": "台风分析系统API",
-        "version": settings.APP_VERSION,
-        "description": "基于FastAPI + AI大模型的智能台风分析系统",
-        "docs": "/docs",
-        "redoc": "/redoc",
-        "health": "/health"
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """健康检查 - 返回服务状态和版本信息"""
-    return {
-        "status": "healthy",
-        "version": settings.APP_VERSION,
-        "service": "台风分析系统API"
-    }
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+
 if __name__ == "__main__":
     import uvicorn
     
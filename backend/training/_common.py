@@ -0,0 +1,257 @@
+"""
+训练脚本公共组件
+
+命令行参数、数据加载和模型/优化器构建在各训练入口之间共用，
+性能相关的设置（锁页内存、数据加载进程数、fused 优化器等）只需在此处修改一次
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.utils.data import (
+    BatchSampler, DataLoader, RandomSampler, SequentialSampler, TensorDataset
+)
+
+from app.services.prediction.data import csv_loader, dataset, preprocessor
+from app.services.prediction.data.csv_loader import CSVDataLoader
+from app.services.prediction.data.dataset import CSVTyphoonDataset
+from app.services.prediction.models.transformer_lstm_model import TransformerLSTMModel
+
+logger = logging.getLogger(__name__)
+
+
+def add_common_args(parser):
+    """添加数据集、模型和优化器相关的公共命令行参数"""
+    parser.add_argument('--csv-path', type=str, default=None)
+    parser.add_argument('--start-year', type=int, default=2000)
+    parser.add_argument('--end-year', type=int, default=2020)
+    parser.add_argument('--sequence-length', type=int, default=12)
+    parser.add_argument('--prediction-steps', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--lr', type=float, default=0.001)
+    parser.add_argument('--weight-decay', type=float, default=1e-5)
+    parser.add_argument('--device', type=str, default='cuda')
+    parser.add_argument('--save-dir', type=str, default='./models')
+    parser.add_argument('--val-split', type=float, default=0.2)
+    parser.add_argument('--rebuild-cache', action='store_true', help='忽略已有的数据集缓存，重新从CSV构建')
+    # 样本已全部缓存为内存中的 TensorDataset，每个批次只是一次高级索引，
+    # 默认在主进程中加载；多进程只会额外增加批次跨进程传输的开销
+    parser.add_argument('--num-workers', type=int, default=0)
+    return parser
+
+
+def dataset_fingerprint(args):
+    """
+    计算数据集缓存的指纹
+
+    包含CSV文件的实际路径、大小和修改时间，以及样本构建相关源码（CSV读取、清洗、归一化）的内容，
+    数据文件更新、换用同名的其他CSV或预处理逻辑变化时指纹随之改变，不会误用旧缓存
+    """
+    csv_path = CSVDataLoader(csv_path=args.csv_path).csv_path.resolve()
+    digest = hashlib.sha1(str(csv_path).encode('utf-8'))
+    if csv_path.exists():
+        stat = csv_path.stat()
+        digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    for module in (csv_loader, dataset, preprocessor):
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def save_npy_atomic(path, array):
+    """写入临时文件后原子重命名，中断或并发运行时不会留下不完整的 .npy 文件"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def load_npy_cache(inputs_path, targets_path):
+    """
+    以内存映射方式加载缓存的样本数组
+
+    Returns:
+        (inputs, targets)，缓存不存在或已损坏时返回 None
+    """
+    if not (inputs_path.exists() and targets_path.exists()):
+        return None
+    try:
+        # 写时复制映射，张量可写且不会修改缓存文件
+        inputs_all = np.load(inputs_path, mmap_mode='c')
+        targets_all = np.load(targets_path, mmap_mode='c')
+    except (ValueError, OSError) as e:
+        logger.warning(f"数据集缓存无法读取，重新构建: {e}")
+        return None
+    if len(inputs_all) != len(targets_all):
+        logger.warning(f"数据集缓存样本数不一致（{len(inputs_all)} / {len(targets_all)}），重新构建")
+        return None
+    return inputs_all, targets_all
+
+
+def load_cached_dataset(args):
+    """
+    加载训练数据集，优先使用缓存的样本数组
+
+    首次运行时从CSV构建 CSVTyphoonDataset，并将全部样本堆叠后保存为 .npy 缓存；
+    之后以内存映射方式加载，跳过CSV解析和逐样本预处理。
+    缓存文件名包含 dataset_fingerprint，数据源或预处理变化后自动重建；
+    指定 --rebuild-cache 时强制重建
+
+    Returns:
+        Dataset: 样本为 (input_sequence, target_sequence) 的数据集
+    """
+    csv_name = Path(args.csv_path).stem if args.csv_path else 'default'
+    cache_prefix = Path(args.save_dir) / (
+        f"dataset_cache_{csv_name}_{args.start_year}_{args.end_year}_"
+        f"{args.sequence_length}_{args.prediction_steps}_{dataset_fingerprint(args)}"
+    )
+    inputs_path = cache_prefix.with_name(cache_prefix.name + '_inputs.npy')
+    targets_path = cache_prefix.with_name(cache_prefix.name + '_targets.npy')
+
+    cached = None if args.rebuild_cache else load_npy_cache(inputs_path, targets_path)
+    if cached is not None:
+        inputs_all, targets_all = cached
+        logger.info(f"从缓存加载数据集: {cache_prefix}")
+    else:
+        csv_dataset = CSVTyphoonDataset(
+            csv_path=args.csv_path,
+            sequence_length=args.sequence_length,
+            prediction_steps=args.prediction_steps,
+            start_year=args.start_year,
+            end_year=args.end_year
+        )
+        if len(csv_dataset) == 0:
+            return csv_dataset
+
+        inputs_all = np.stack([sample[0] for sample in csv_dataset.samples]).astype(np.float32)
+        targets_all = np.stack([sample[1] for sample in csv_dataset.samples]).astype(np.float32)
+
+        inputs_path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写目标再写输入：输入文件存在即表示两者都已完整写入
+        save_npy_atomic(targets_path, targets_all)
+        save_npy_atomic(inputs_path, inputs_all)
+        logger.info(f"数据集缓存已保存: {cache_prefix}")
+
+    return TensorDataset(torch.from_numpy(inputs_all), torch.from_numpy(targets_all))
+
+
+def build_loaders(args, device):
+    """
+    构建训练集和验证集的数据加载器
+
+    Returns:
+        (train_loader, val_loader)，数据集为空时返回 (None, None)
+
+    Raises:
+        ValueError: 划分后训练集产生不了任何批次
+    """
+    logger.info("\n加载数据集...")
+    full_dataset = load_cached_dataset(args)
+
+    logger.info(f"数据集大小: {len(full_dataset)} 个样本")
+
+    if len(full_dataset) == 0:
+        logger.error("数据集为空")
+        return None, None
+
+    # 划分数据集
+    val_size = int(len(full_dataset) * args.val_split)
+
+    # 预先计算打乱后的索引，直接切片缓存数组得到两个 TensorDataset，
+    # 避免 Subset 逐样本转换索引再调用底层 __getitem__
+    indices = torch.from_numpy(np.random.default_rng(42).permutation(len(full_dataset)))
+    train_dataset = TensorDataset(*(t[indices[val_size:]] for t in full_dataset.tensors))
+    val_dataset = TensorDataset(*(t[indices[:val_size]] for t in full_dataset.tensors))
+
+    logger.info(f"训练集: {len(train_dataset)}, 验证集: {len(val_dataset)}")
+
+    # CUDA 上使用锁页内存，配合 non_blocking 让主机到设备的拷贝与计算重叠
+    pin_memory = device.type == 'cuda'
+
+    # CUDA 上模型经 torch.compile 或 CUDA Graph 捕获，丢弃末尾不完整批次以固定批次形状，
+    # 避免重新编译或捕获；训练集不足一个批次时保留唯一的批次（形状同样固定）。
+    # CPU 上不编译，保留末尾批次，所有样本都参与训练
+    drop_last = device.type == 'cuda' and len(train_dataset) >= args.batch_size
+
+    # 按批次采样索引，TensorDataset 一次高级索引直接取出整批张量，无需逐样本取出再 stack；
+    # batch_size=None 关闭自动批处理，collate 退化为原样透传
+    train_loader = DataLoader(
+        train_dataset,
+        sampler=BatchSampler(
+            RandomSampler(train_dataset),
+            batch_size=args.batch_size,
+            drop_last=drop_last
+        ),
+        batch_size=None,
+        num_workers=args.num_workers,
+        pin_memory=pin_memory,
+        persistent_workers=args.num_workers > 0,
+        prefetch_factor=4 if args.num_workers > 0 else None
+    )
+    if len(train_loader) == 0:
+        raise ValueError(
+            f"训练集没有可用的批次（训练样本 {len(train_dataset)} 个，batch_size={args.batch_size}），"
+            f"请检查年份范围和 --val-split"
+        )
+
+    # 验证集每个epoch完全相同，预先整理成批次缓存，避免每轮重复索引和collate
+    val_loader = list(DataLoader(
+        val_dataset,
+        sampler=BatchSampler(
+            SequentialSampler(val_dataset),
+            batch_size=args.batch_size,
+            drop_last=False
+        ),
+        batch_size=None,
+        num_workers=0,
+        pin_memory=pin_memory
+    ))
+
+    return train_loader, val_loader
+
+
+def build_model_and_optim(args, device):
+    """
+    构建模型、优化器和学习率调度器
+
+    Returns:
+        (model, optimizer, scheduler)
+    """
+    logger.info("\n初始化模型...")
+    model = TransformerLSTMModel(
+        input_size=14,  # 14维特征
+        hidden_size=256,
+        num_lstm_layers=2,
+        num_transformer_layers=2,
+        num_heads=8,
+        output_size=4,
+        prediction_steps=args.prediction_steps,
+        dropout=0.2
+    )
+
+    # 统计模型参数量
+    total_params = sum(p.numel() for p in model.parameters())
+    trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
+    logger.info(f"模型总参数量: {total_params:,}")
+    logger.info(f"可训练参数量: {trainable_params:,}")
+
+    # CUDA 上使用单内核的 fused AdamW，CPU 上使用 foreach 多张量实现
+    optimizer = torch.optim.AdamW(
+        model.parameters(),
+        lr=args.lr,
+        weight_decay=args.weight_decay,
+        **({'fused': True} if device.type == 'cuda' else {'foreach': True})
+    )
+
+    scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
+        optimizer,
+        mode='min',
+        factor=0.5,
+        patience=5,
+        verbose=True
+    )
+
+    return model, optimizer, scheduler
@@ -5,6 +5,7 @@
 """
 import argparse
 import logging
+import pickle
 from pathlib import Path
 
 import torch
@@ -32,59 +33,75 @@ def evaluate_model(model, test_loader, device):
     """
     model.eval()
     
-    all_predictions = []
-    all_targets = []
-    all_confidences = []
+    # 在设备上在线累积误差统计量，避免逐批次拷回主机并拼接全部预测结果
+    abs_err_sum = torch.zeros(4, dtype=torch.float64, device=device)
+    sq_err_sum = torch.zeros(4, dtype=torch.float64, device=device)
+    path_err_step_sum = None
+    path_sq_sum = torch.zeros((), dtype=torch.float64, device=device)
+    conf_sum = torch.zeros((), dtype=torch.float64, device=device)
+    conf_sq_sum = torch.zeros((), dtype=torch.float64, device=device)
+    n_samples = 0
     
-    with torch.no_grad():
+    # CUDA 上使用 FP16 自动混合精度推理，并将末尾批次补齐到固定形状以复用 CUDA Graph
+    use_amp = device.type == 'cuda'
+    batch_size = test_loader.batch_size
+    
+    with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=torch.float16, enabled=use_amp):
         for inputs, targets in tqdm(test_loader, desc="评估中"):
-            inputs = inputs.to(device)
-            targets = targets.to(device)
+            inputs = inputs.to(device, non_blocking=True)
+            targets = targets.to(device, non_blocking=True)
+            
+            n = inputs.shape[0]
+            if use_amp and n < batch_size:
+                padding = inputs.new_zeros((batch_size - n, *inputs.shape[1:]))
+                inputs = torch.cat([inputs, padding], dim=0)
             
             pred_mean, pred_std, confidence = model(inputs)
+            pred_mean, confidence = pred_mean[:n], confidence[:n]
+            
+            diff = pred_mean.float() - targets  # [B, T, 4]
+            conf = confidence.float()
+            
+            abs_err_sum += diff.abs().sum(dim=(0, 1), dtype=torch.float64)
+            sq_err_sum += (diff * diff).sum(dim=(0, 1), dtype=torch.float64)
+            
+            # 路径误差（欧氏距离）
+            path_errors = torch.hypot(diff[:, :, 0], diff[:, :, 1])
+            if path_err_step_sum is None:
+                path_err_step_sum = torch.zeros(diff.shape[1], dtype=torch.float64, device=device)
+            path_err_step_sum += path_errors.sum(dim=0, dtype=torch.float64)
+            path_sq_sum += (path_errors * path_errors).sum(dtype=torch.float64)
+            n_samples += n
             
-            all_predictions.append(pred_mean.cpu().numpy())
-            all_targets.append(targets.cpu().numpy())
-            all_confidences.append(confidence.cpu().numpy())
-    
-    # 合并所有批次
-    predictions = np.concatenate(all_predictions, axis=0)
-    targets = np.concatenate(all_targets, axis=0)
-    confidences = np.concatenate(all_confidences, axis=0)
-    
-    # 计算各项误差指标
-    # 纬度误差
-    lat_errors = np.abs(predictions[:, :, 0] - targets[:, :, 0])
-    lat_mae = np.mean(lat_errors)
-    lat_rmse = np.sqrt(np.mean(lat_errors ** 2))
-    
-    # 经度误差
-    lon_errors = np.abs(predictions[:, :, 1] - targets[:, :, 1])
-    lon_mae = np.mean(lon_errors)
-    lon_rmse = np.sqrt(np.mean(lon_errors ** 2))
-    
-    # 气压误差
-    pressure_errors = np.abs(predictions[:, :, 2] - targets[:, :, 2])
-    pressure_mae = np.mean(pressure_errors)
-    
-    # 风速误差
-    wind_errors = np.abs(predictions[:, :, 3] - targets[:, :, 3])
-    wind_mae = np.mean(wind_errors)
-    
-    # 路径误差（欧氏距离）
-    path_errors = np.sqrt(lat_errors ** 2 + lon_errors ** 2)
-    path_mae = np.mean(path_errors)
-    path_rmse = np.sqrt(np.mean(path_errors ** 2))
+            conf_sum += conf.sum(dtype=torch.float64)
+            conf_sq_sum += (conf * conf).sum(dtype=torch.float64)
+    
+    # 仅在结束时将少量统计量拷回主机
+    n_steps = path_err_step_sum.shape[0]
+    n_points = n_samples * n_steps
+    abs_err_sum = abs_err_sum.cpu().numpy()
+    sq_err_sum = sq_err_sum.cpu().numpy()
+    path_err_step_sum = path_err_step_sum.cpu().numpy()
+    path_sq_sum = path_sq_sum.item()
+    conf_sum = conf_sum.item()
+    conf_sq_sum = conf_sq_sum.item()
+    
+    # 计算各项误差指标（纬度、经度、气压、风速）
+    mae = abs_err_sum / n_points
+    rmse = np.sqrt(sq_err_sum / n_points)
+    lat_mae, lon_mae, pressure_mae, wind_mae = mae
+    lat_rmse, lon_rmse = rmse[0], rmse[1]
+    
+    # 路径误差
+    path_mae = path_err_step_sum.sum() / n_points
+    path_rmse = np.sqrt(path_sq_sum / n_points)
     
     # 按预测时间步分析
-    time_step_errors = []
-    for t in range(predictions.shape[1]):
-        step_error = np.mean(path_errors[:, t])
-        time_step_errors.append(step_error)
+    time_step_errors = (path_err_step_sum / n_samples).tolist()
     
     # 置信度统计
-    avg_confidence = np.mean(confidences)
-    confidence_std = np.std(confidences)
+    avg_confidence = conf_sum / n_points
+    confidence_std = np.sqrt(max(conf_sq_sum / n_points - avg_confidence ** 2, 0.0))
     
     return {
         'lat_mae': lat_mae,
@@ -137,7 +154,8 @@ def main():
     parser.add_argument('--csv-path', type=str, required=True, help='测试数据CSV路径')
     parser.add_argument('--start-year', type=int, default=2023, help='测试数据起始年份')
     parser.add_argument('--end-year', type=int, default=2024, help='测试数据结束年份')
-    parser.add_argument('--batch-size', type=int, default=32, help='批次大小')
+    parser.add_argument('--batch-size', type=int, default=256, help='批次大小')
+    parser.add_argument('--num-workers', type=int, default=4, help='数据加载进程数')
     parser.add_argument('--device', type=str, default='cuda', help='设备')
     
     args = parser.parse_args()
@@ -170,7 +188,10 @@ def main():
             test_dataset,
             batch_size=args.batch_size,
             shuffle=False,
-            collate_fn=collate_fn
+            collate_fn=collate_fn,
+            num_workers=args.num_workers,
+            pin_memory=device.type == 'cuda',
+            persistent_workers=args.num_workers > 0
         )
         
         # 加载模型
@@ -186,9 +207,18 @@ def main():
             dropout=0.2
         )
         
-        checkpoint = torch.load(args.model_path, map_location=device)
+        try:
+            # 新格式检查点仅含张量和基础类型，可内存映射直接加载
+            checkpoint = torch.load(args.model_path, map_location=device, mmap=True, weights_only=True)
+        except (pickle.UnpicklingError, RuntimeError):
+            # 旧格式检查点内嵌训练历史（含numpy对象）或非zip格式
+            checkpoint = torch.load(args.model_path, map_location=device, weights_only=False)
         model.load_state_dict(checkpoint['model_state_dict'])
-        model = model.to(device)
+        model = model.to(device).eval()
+        
+        # 评估时输入形状固定，CUDA 上编译为 CUDA Graph 降低内核启动开销
+        if device.type == 'cuda':
+            model = torch.compile(model, mode='reduce-overhead')
         
         logger.info(f"模型加载成功: {args.model_path}")
         
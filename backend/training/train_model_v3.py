@@ -14,6 +14,10 @@ from datetime import datetime
 import sys
 import os
 import json
+import math
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,13 +25,19 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torch.utils.data import DataLoader, random_split
 import numpy as np
 from tqdm import tqdm
 
-from app.services.prediction.data.dataset import CSVTyphoonDataset, TyphoonDataCollator
+# orjson 为可选依赖，未安装时回退到标准库 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from app.services.prediction.data.preprocessor import DataPreprocessor, NormalizationParams, FEATURE_COLUMNS
-from app.services.prediction.models.transformer_lstm_model import TransformerLSTMModel
+
+from _common import add_common_args, build_loaders, build_model_and_optim
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,6 +46,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# EnhancedLoss 返回的分项损失向量中各元素的含义
+LOSS_COMPONENTS = ('nll', 'path', 'intensity', 'physics', 'temporal', 'confidence', 'total')
+
+
 class EnhancedLoss(nn.Module):
     """
     增强版损失函数
@@ -61,6 +75,11 @@ class EnhancedLoss(nn.Module):
         self.physics_weight = physics_weight
         self.temporal_weight = temporal_weight
         self.confidence_weight = confidence_weight
+        # 各分项损失的权重向量（负对数似然权重固定为1），总损失由一次点积得到；
+        # 注册为 buffer，随损失函数一起迁移到训练设备
+        self.register_buffer('weights', torch.tensor([
+            1.0, path_weight, intensity_weight, physics_weight, temporal_weight, confidence_weight
+        ]))
     
     def forward(self, predictions_mean, predictions_std, confidence, targets):
         """
@@ -72,80 +91,158 @@ class EnhancedLoss(nn.Module):
             confidence: 置信度 [batch, pred_steps]
             targets: 目标值 [batch, pred_steps, 4]
         """
-        # 1. 负对数似然损失
-        nll_loss = 0.5 * torch.log(2 * np.pi * predictions_std ** 2) + \
-                   (targets - predictions_mean) ** 2 / (2 * predictions_std ** 2)
-        nll_loss = nll_loss.mean()
-        
-        # 2. 路径损失（经纬度）- 使用归一化后的值
-        path_loss = torch.mean((predictions_mean[:, :, :2] - targets[:, :, :2]) ** 2)
-        
-        # 3. 强度损失（气压、风速）
-        intensity_loss = torch.mean((predictions_mean[:, :, 2:] - targets[:, :, 2:]) ** 2)
-        
-        # 4. 物理约束损失 - 最大移动速度限制
-        pred_lats = predictions_mean[:, :, 0]
-        pred_lons = predictions_mean[:, :, 1]
-        
-        # 计算相邻预测点之间的距离
-        lat_diff = torch.diff(pred_lats, dim=1)
-        lon_diff = torch.diff(pred_lons, dim=1)
-        distance = torch.sqrt(lat_diff ** 2 + lon_diff ** 2)
-        
-        # 惩罚过大的移动（假设6小时最大移动5度，归一化后约为0.028）
-        physics_loss = torch.mean(F.relu(distance - 0.028) ** 2)
-        
-        # 5. 时序一致性损失 - 多阶平滑约束
-        # 5.1 一阶平滑：惩罚速度变化（相邻点差异）
-        lat_velocity = torch.diff(pred_lats, dim=1)
-        lon_velocity = torch.diff(pred_lons, dim=1)
-        first_order_smooth = torch.mean(lat_velocity ** 2) + torch.mean(lon_velocity ** 2)
-        
-        # 5.2 二阶平滑：惩罚加速度变化（速度的差异）
-        if pred_lats.shape[1] > 2:
-            lat_acceleration = torch.diff(lat_velocity, dim=1)
-            lon_acceleration = torch.diff(lon_velocity, dim=1)
-            second_order_smooth = torch.mean(lat_acceleration ** 2) + torch.mean(lon_acceleration ** 2)
-        else:
-            second_order_smooth = torch.tensor(0.0, device=pred_lats.device)
-        
-        # 5.3 连续性约束：惩罚与历史趋势的不一致
-        # 如果历史数据显示向北移动，预测不应突然大幅向南
-        # 这里简化处理，只惩罚大的方向变化
-        direction_change = torch.abs(torch.diff(lat_velocity, dim=1)) + \
-                          torch.abs(torch.diff(lon_velocity, dim=1))
-        continuity_loss = torch.mean(F.relu(direction_change - 0.01))  # 允许小的方向变化
-        
-        temporal_loss = first_order_smooth + 0.5 * second_order_smooth + continuity_loss
-        
-        # 6. 置信度校准损失
-        with torch.no_grad():
-            # 计算每个预测步的实际误差 [batch, pred_steps]
-            actual_error = torch.mean((predictions_mean[:, :, :2] - targets[:, :, :2]) ** 2, dim=2)
-            # 将误差转换为期望的置信度（误差越小，置信度越高）
-            target_confidence = torch.exp(-actual_error * 10)  # 缩放因子10
-        
-        confidence_loss = F.mse_loss(confidence, target_confidence)
-        
-        # 总损失
-        total_loss = (
-            nll_loss +
-            self.path_weight * path_loss +
-            self.intensity_weight * intensity_loss +
-            self.physics_weight * physics_loss +
-            self.temporal_weight * temporal_loss +
-            self.confidence_weight * confidence_loss
+        return _compute_losses(
+            predictions_mean, predictions_std, confidence, targets,
+            self.weights.to(predictions_mean.device)
         )
+
+
+def _compute_losses(
+    predictions_mean: torch.Tensor,
+    predictions_std: torch.Tensor,
+    confidence: torch.Tensor,
+    targets: torch.Tensor,
+    weights: torch.Tensor
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    计算总损失及各分项损失
+
+    独立为纯张量函数，损失函数经 TorchScript 脚本化时一并编译，融合其中的逐元素运算
+
+    Args:
+        weights: (负对数似然, 路径, 强度, 物理约束, 时序一致性, 置信度) 各项损失权重 [6]
+
+    Returns:
+        (total_loss, metrics)，metrics 为按 LOSS_COMPONENTS 顺序排列的分项损失向量
+    """
+    # 平方误差只计算一次，供负对数似然、路径、强度和置信度校准损失复用
+    sq_err = (predictions_mean - targets) ** 2
+    pos_sq_err = sq_err[:, :, :2]
+    
+    # 1. 高斯负对数似然损失，与 F.gaussian_nll_loss(full=True, eps=1e-6) 的取值和梯度一致：
+    #    方差只计算一次并设下限，避免 log(0) 和除零；下限只作用于数值，梯度按未截断的方差回传
+    #    （与 gaussian_nll_loss 在 no_grad 下截断副本相同），方差很小时梯度不会被置零。
+    #    不直接调用该函数，因为它每次都会检查方差是否为负，引入一次设备到主机的同步
+    variance = predictions_std ** 2
+    variance = variance + (variance.clamp(min=1e-6) - variance).detach()
+    nll_loss = 0.5 * (math.log(2 * math.pi) + torch.log(variance) + sq_err / variance)
+    nll_loss = nll_loss.mean()
+    
+    # 2. 路径损失（经纬度）- 使用归一化后的值
+    path_loss = pos_sq_err.mean()
+    
+    # 3. 强度损失（气压、风速）
+    intensity_loss = sq_err[:, :, 2:].mean()
+    
+    # 4. 物理约束损失 - 最大移动速度限制
+    pred_lats = predictions_mean[:, :, 0]
+    pred_lons = predictions_mean[:, :, 1]
+    
+    # 相邻预测点之间的位移（即速度）和速度的差分（即加速度）各只计算一次，
+    # 供物理约束、一阶/二阶平滑和连续性约束复用
+    lat_velocity = torch.diff(pred_lats, dim=1)
+    lon_velocity = torch.diff(pred_lons, dim=1)
+    lat_acceleration = torch.diff(lat_velocity, dim=1)
+    lon_acceleration = torch.diff(lon_velocity, dim=1)
+    
+    # 计算相邻预测点之间的距离
+    lat_velocity_sq = lat_velocity ** 2
+    lon_velocity_sq = lon_velocity ** 2
+    distance = torch.sqrt(lat_velocity_sq + lon_velocity_sq)
+    
+    # 惩罚过大的移动（假设6小时最大移动5度，归一化后约为0.028）
+    physics_loss = torch.mean(F.relu(distance - 0.028) ** 2)
+    
+    # 5. 时序一致性损失 - 多阶平滑约束
+    # 5.1 一阶平滑：惩罚速度变化（相邻点差异）
+    first_order_smooth = torch.mean(lat_velocity_sq) + torch.mean(lon_velocity_sq)
+    
+    # 5.2 二阶平滑：惩罚加速度变化（速度的差异）
+    if pred_lats.shape[1] > 2:
+        second_order_smooth = torch.mean(lat_acceleration ** 2) + torch.mean(lon_acceleration ** 2)
+    else:
+        second_order_smooth = torch.tensor(0.0, device=pred_lats.device)
+    
+    # 5.3 连续性约束：惩罚与历史趋势的不一致
+    # 如果历史数据显示向北移动，预测不应突然大幅向南
+    # 这里简化处理，只惩罚大的方向变化
+    direction_change = torch.abs(lat_acceleration) + torch.abs(lon_acceleration)
+    continuity_loss = torch.mean(F.relu(direction_change - 0.01))  # 允许小的方向变化
+    
+    temporal_loss = first_order_smooth + 0.5 * second_order_smooth + continuity_loss
+    
+    # 6. 置信度校准损失
+    # 计算每个预测步的实际误差 [batch, pred_steps]，复用路径平方误差，目标置信度不参与反向传播
+    actual_error = pos_sq_err.detach().mean(dim=2)
+    # 将误差转换为期望的置信度（误差越小，置信度越高）
+    target_confidence = torch.exp(-actual_error * 10)  # 缩放因子10
+    
+    confidence_loss = F.mse_loss(confidence, target_confidence)
+    
+    # 总损失：分项损失堆叠后与权重向量做一次点积
+    losses = torch.stack([
+        nll_loss, path_loss, intensity_loss, physics_loss, temporal_loss, confidence_loss
+    ])
+    total_loss = torch.dot(losses, weights)
+    
+    # 分项损失与总损失组成一个设备上的向量（顺序同 LOSS_COMPONENTS），由调用方决定何时同步到主机
+    metrics = torch.cat([losses, total_loss.unsqueeze(0)]).detach()
+    return total_loss, metrics
+
+
+class CUDAPrefetcher:
+    """
+    数据预取器
+
+    在专用的 CUDA 拷贝流上提前一个批次将数据搬到设备，使主机到设备的传输与当前批次的计算重叠；
+    非 CUDA 设备上退化为普通的同步拷贝
+    """
+    
+    def __init__(self, loader, device):
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream() if torch.device(device).type == 'cuda' else None
+    
+    def __len__(self):
+        return len(self.loader)
+    
+    def __iter__(self):
+        """
+        Yields:
+            (inputs, targets): 已位于设备上的批次
+        """
+        if self.stream is None:
+            for inputs, targets in self.loader:
+                yield inputs.to(self.device), targets.to(self.device)
+            return
         
-        return total_loss, {
-            'nll': nll_loss.item(),
-            'path': path_loss.item(),
-            'intensity': intensity_loss.item(),
-            'physics': physics_loss.item(),
-            'temporal': temporal_loss.item(),
-            'confidence': confidence_loss.item(),
-            'total': total_loss.item()
-        }
+        pending = None
+        for inputs, targets in self.loader:
+            preloaded = self._preload(inputs, targets)
+            if pending is not None:
+                yield self._wait(*pending)
+            pending = preloaded
+        
+        if pending is not None:
+            yield self._wait(*pending)
+    
+    def _preload(self, inputs, targets):
+        """在拷贝流上发起异步拷贝，并记录拷贝完成事件"""
+        with torch.cuda.stream(self.stream):
+            inputs = inputs.to(self.device, non_blocking=True)
+            targets = targets.to(self.device, non_blocking=True)
+            ready = torch.cuda.Event()
+            ready.record(self.stream)
+        return inputs, targets, ready
+    
+    @staticmethod
+    def _wait(inputs, targets, ready):
+        """让计算流等待拷贝完成，并标记张量在计算流上被使用，防止显存被提前复用"""
+        current_stream = torch.cuda.current_stream()
+        current_stream.wait_event(ready)
+        inputs.record_stream(current_stream)
+        targets.record_stream(current_stream)
+        return inputs, targets
 
 
 class Trainer:
@@ -161,23 +258,90 @@ class Trainer:
         scheduler,
         device='cpu',
         save_dir='./models',
-        early_stopping_patience=15
+        early_stopping_patience=15,
+        cuda_graph=False,
+        grad_accum=1,
+        progress=False
     ):
         self.model = model.to(device)
+        # 模型已使用 cuDNN nn.LSTM，迁移设备后整理权重为连续缓冲区
+        if isinstance(getattr(self.model, 'lstm', None), nn.LSTM):
+            self.model.lstm.flatten_parameters()
+        # 保留未编译的原始模型，保存检查点时使用，避免 state_dict 键名带 _orig_mod 前缀
+        self.raw_model = self.model
         self.train_loader = train_loader
         self.val_loader = val_loader
-        self.criterion = criterion
+        self.criterion = criterion.to(device)
         self.optimizer = optimizer
         self.scheduler = scheduler
         self.device = device
         self.save_dir = Path(save_dir)
         self.save_dir.mkdir(parents=True, exist_ok=True)
         
+        # CUDA 上启用自动混合精度：GPU 原生支持 BF16（Ampere 及以上）时优先使用（指数范围与 FP32 相同，
+        # 无需损失缩放）；更早的 GPU 上 BF16 只能模拟执行、用不上 Tensor Core，改用 FP16 + GradScaler 防止梯度下溢
+        self.device_type = torch.device(device).type
+        self.use_amp = self.device_type == 'cuda'
+        self.amp_dtype = (
+            torch.bfloat16
+            if self.use_amp and torch.cuda.is_bf16_supported(including_emulation=False)
+            else torch.float16
+        )
+        self.scaler = torch.amp.GradScaler('cuda', enabled=self.use_amp and self.amp_dtype == torch.float16)
+        
+        # 训练和验证都在专用拷贝流上提前一个批次预取数据
+        self.train_prefetcher = CUDAPrefetcher(train_loader, device)
+        self.val_prefetcher = CUDAPrefetcher(val_loader, device)
+        
+        # 可选：将模型前向+反向捕获为 CUDA Graph，消除每步的内核启动开销
+        self.cuda_graph = cuda_graph and self.device_type == 'cuda'
+        if self.cuda_graph:
+            self._capture_cuda_graph()
+        elif self.device_type == 'cuda':
+            # reduce-overhead 模式同样基于 CUDA Graph，与 --cuda-graph 二选一；编译失败时回退到 eager
+            torch._dynamo.config.suppress_errors = True
+            self.model = torch.compile(self.model, mode='reduce-overhead', fullgraph=False, dynamic=False)
+            # 输入形状固定，正常情况下训练/验证各只编译一次；出现重新编译时输出原因便于排查
+            torch._logging.set_logs(recompiles=True)
+        
+        # 非 CUDA 设备上模型未经编译，验证时改用 TorchScript 脚本化的模型，减少 Python 层调度开销。
+        # 不做 torch.jit.freeze：冻结会把权重内联为常量，训练更新后无法同步；
+        # 脚本化模型与原模型共享参数，训练中的更新对验证直接可见
+        self.eval_model = self.model
+        if self.device_type != 'cuda':
+            try:
+                self.eval_model = torch.jit.script(self.raw_model)
+            except Exception as e:
+                logger.warning(f"模型脚本化失败，验证使用 eager 模式: {e}")
+        
         self.train_losses = []
         self.val_losses = []
         self.best_val_loss = float('inf')
         self.early_stopping_counter = 0
         self.early_stopping_patience = early_stopping_patience
+        # 后台写检查点的单线程池，保存任务按提交顺序依次执行
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checkpoint-writer')
+        self._pending_save = None
+        # 检查点中每次都相同的部分只构建一次
+        self._ckpt_static = {
+            'feature_columns': FEATURE_COLUMNS,
+            'normalization_params': {
+                'lat_min': -90.0,
+                'lat_max': 90.0,
+                'lon_min': -180.0,
+                'lon_max': 180.0,
+                'pressure_mean': 1000.0,
+                'pressure_std': 50.0,
+                'wind_mean': 20.0,
+                'wind_std': 15.0,
+            }
+        }
+        
+        # 梯度累积步数：每 grad_accum 个微批次执行一次优化器更新
+        self.grad_accum = max(1, grad_accum)
+        # 默认每隔若干批次记录一次日志；progress=True 时改用 tqdm 进度条，便于交互式查看
+        self.progress = progress
+        self.log_interval = 50
         
         # 记录训练历史
         self.history = {
@@ -187,78 +351,119 @@ class Trainer:
             'learning_rate': []
         }
     
+    def _capture_cuda_graph(self):
+        """
+        使用 make_graphed_callables 捕获模型的前向和反向计算
+
+        损失和优化器步骤仍以 eager 模式执行：GradScaler.step 需要在主机端检查 inf，
+        ReduceLROnPlateau 会在主机端修改学习率，二者都无法放入静态图。
+        捕获要求每个批次形状固定，训练集 DataLoader 需设置 drop_last=True
+        """
+        sample_inputs, _ = next(iter(self.train_loader))
+        sample_inputs = sample_inputs.to(self.device)
+        
+        self.model.train()
+        # AMP 与 CUDA Graph 同时使用时必须关闭 autocast 的权重缓存
+        with torch.autocast(device_type='cuda', dtype=self.amp_dtype, cache_enabled=False):
+            self.model = torch.cuda.make_graphed_callables(self.model, (sample_inputs,))
+        logger.info(f"已捕获 CUDA Graph，批次形状: {tuple(sample_inputs.shape)}")
+    
     def train_epoch(self):
         """训练一个epoch"""
         self.model.train()
-        total_loss = 0
-        total_metrics = {
-            'nll': 0, 'path': 0, 'intensity': 0,
-            'physics': 0, 'temporal': 0, 'confidence': 0
-        }
-        
-        pbar = tqdm(self.train_loader, desc="Training")
-        for batch_idx, (inputs, targets) in enumerate(pbar):
-            inputs = inputs.to(self.device)
-            targets = targets.to(self.device)
-            
-            self.optimizer.zero_grad()
+        # 分项损失向量在设备上累积，每个epoch只同步一次
+        metrics_sum = torch.zeros(len(LOSS_COMPONENTS), device=self.device)
+        
+        n_batches = len(self.train_loader)
+        self.optimizer.zero_grad(set_to_none=True)
+        
+        batches = self.train_prefetcher
+        if self.progress:
+            batches = tqdm(batches, desc="Training", total=n_batches)
+        for batch_idx, (inputs, targets) in enumerate(batches):
+            # 保证输入内存连续，使 cuDNN 选用持久化 LSTM 内核（已连续时为空操作）
+            inputs = inputs.contiguous()
+            targets = targets.contiguous()
             
             # 前向传播
-            pred_mean, pred_std, confidence = self.model(inputs)
+            with torch.autocast(
+                device_type=self.device_type,
+                dtype=self.amp_dtype,
+                enabled=self.use_amp,
+                cache_enabled=not self.cuda_graph
+            ):
+                pred_mean, pred_std, confidence = self.model(inputs)
+            
+            # 计算损失（FP32，避免 log/exp 在半精度下溢出）
+            loss, metrics = self.criterion(pred_mean.float(), pred_std.float(), confidence.float(), targets)
             
-            # 计算损失
-            loss, metrics = self.criterion(pred_mean, pred_std, confidence, targets)
+            # 反向传播（梯度累积时按当前累积组的实际批次数缩放损失，
+            # epoch 末尾不足 grad_accum 个批次的组同样得到组内平均梯度）
+            group_start = batch_idx - batch_idx % self.grad_accum
+            group_size = min(self.grad_accum, n_batches - group_start)
+            self.scaler.scale(loss / group_size).backward()
             
-            # 反向传播
-            loss.backward()
-            torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
-            self.optimizer.step()
+            if (batch_idx + 1) % self.grad_accum == 0 or batch_idx + 1 == n_batches:
+                self.scaler.unscale_(self.optimizer)
+                torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
+                self.scaler.step(self.optimizer)
+                self.scaler.update()
+                self.optimizer.zero_grad(set_to_none=True)
             
-            total_loss += loss.item()
-            for key in total_metrics:
-                total_metrics[key] += metrics[key]
+            metrics_sum += metrics
             
-            pbar.set_postfix({'loss': f'{loss.item():.6f}'})
+            # 每隔 log_interval 个批次才同步一次，读取设备上累积的平均损失
+            if batch_idx % self.log_interval == 0:
+                running_loss = (metrics_sum[-1] / (batch_idx + 1)).item()
+                if self.progress:
+                    batches.set_postfix({'loss': f'{running_loss:.6f}'})
+                else:
+                    logger.info(f"  batch {batch_idx}/{n_batches} running_loss={running_loss:.6f}")
         
-        avg_loss = total_loss / len(self.train_loader)
-        avg_metrics = {k: v / len(self.train_loader) for k, v in total_metrics.items()}
+        avg_metrics = dict(zip(LOSS_COMPONENTS, metrics_sum.div_(n_batches).tolist()))
+        avg_loss = avg_metrics.pop('total')
         
         return avg_loss, avg_metrics
     
     def validate(self):
         """验证模型"""
-        self.model.eval()
-        total_loss = 0
-        all_predictions = []
-        all_targets = []
-        all_confidences = []
-        
-        with torch.no_grad():
-            for inputs, targets in tqdm(self.val_loader, desc="Validation"):
-                inputs = inputs.to(self.device)
-                targets = targets.to(self.device)
+        self.eval_model.eval()
+        # 在设备上累积损失和误差，整个验证过程只在结束时同步一次
+        total_loss = torch.zeros((), device=self.device)
+        abs_err_sum = torch.zeros(4, device=self.device)
+        conf_sum = torch.zeros((), device=self.device)
+        n_points = 0
+        full_batch = None
+        
+        with torch.inference_mode():
+            batches = self.val_prefetcher
+            if self.progress:
+                batches = tqdm(batches, desc="Validation")
+            for inputs, targets in batches:
+                # CUDA 上末尾不完整批次补零到完整批次大小，保持输入形状固定，
+                # 避免编译后的模型为新形状重新编译；输出再截回真实样本数
+                n = inputs.shape[0]
+                if full_batch is None:
+                    full_batch = n
+                elif self.device_type == 'cuda' and n < full_batch:
+                    padding = inputs.new_zeros((full_batch - n, *inputs.shape[1:]))
+                    inputs = torch.cat([inputs, padding], dim=0)
                 
-                pred_mean, pred_std, confidence = self.model(inputs)
+                with torch.autocast(device_type=self.device_type, dtype=self.amp_dtype, enabled=self.use_amp):
+                    pred_mean, pred_std, confidence = self.eval_model(inputs)
+                pred_mean, pred_std, confidence = pred_mean[:n].float(), pred_std[:n].float(), confidence[:n].float()
                 loss, _ = self.criterion(pred_mean, pred_std, confidence, targets)
                 
-                total_loss += loss.item()
-                all_predictions.append(pred_mean.cpu().numpy())
-                all_targets.append(targets.cpu().numpy())
-                all_confidences.append(confidence.cpu().numpy())
+                total_loss += loss
+                abs_err_sum += (pred_mean - targets).abs().sum(dim=(0, 1))
+                conf_sum += confidence.sum()
+                n_points += targets.shape[0] * targets.shape[1]
         
-        avg_loss = total_loss / len(self.val_loader)
-        
-        # 计算评估指标
-        predictions = np.concatenate(all_predictions, axis=0)
-        targets = np.concatenate(all_targets, axis=0)
-        confidences = np.concatenate(all_confidences, axis=0)
+        avg_loss = (total_loss / len(self.val_loader)).item()
         
         # 计算MAE（使用归一化后的值）
-        mae_lat = np.mean(np.abs(predictions[:, :, 0] - targets[:, :, 0]))
-        mae_lon = np.mean(np.abs(predictions[:, :, 1] - targets[:, :, 1]))
-        mae_pressure = np.mean(np.abs(predictions[:, :, 2] - targets[:, :, 2]))
-        mae_wind = np.mean(np.abs(predictions[:, :, 3] - targets[:, :, 3]))
-        avg_confidence = np.mean(confidences)
+        mae_lat, mae_lon, mae_pressure, mae_wind = (abs_err_sum / n_points).tolist()
+        avg_confidence = (conf_sum / n_points).item()
         
         # 转换为实际度数（近似）
         mae_lat_deg = mae_lat * 180  # 归一化范围是[0,1]，对应实际[-90,90]
@@ -332,73 +537,143 @@ class Trainer:
                 break
             
             # 定期保存
-            if (epoch + 1) % 10 == 0:
+            if (epoch + 1) % 25 == 0:
                 self.save_model(f'model_epoch_{epoch + 1}.pth')
         
         logger.info("\n训练完成")
-        self.save_model('final_model.pth')
+        if self.val_losses and self.early_stopping_counter == 0:
+            # 最后一轮即为最佳模型，直接复制已保存的检查点，避免重复序列化
+            self.wait_for_pending_save()
+            for suffix in ('.pth', '.json'):
+                shutil.copyfile(
+                    self.save_dir / f'best_model{suffix}',
+                    self.save_dir / f'final_model{suffix}'
+                )
+            logger.info(f"模型已保存到: {self.save_dir / 'final_model.pth'}")
+        else:
+            self.save_model('final_model.pth')
         self.save_history()
+        self.wait_for_pending_save()
     
     def save_model(self, filename):
-        """保存模型"""
+        """
+        保存模型
+
+        检查点只包含张量和基础类型，可用 torch.load(..., mmap=True, weights_only=True) 加载；
+        训练过程元数据写入同名 .json 文件
+        """
         save_path = self.save_dir / filename
-        torch.save({
-            'model_state_dict': self.model.state_dict(),
-            'optimizer_state_dict': self.optimizer.state_dict(),
+        # 同一时间只保留一个待写入的快照：先等上一次保存完成（失败时在此抛出），再生成新快照
+        self.wait_for_pending_save()
+        checkpoint, metadata = self._build_checkpoint()
+        # 磁盘 I/O 在后台线程进行，与后续 epoch 的训练重叠
+        self._pending_save = self._io_pool.submit(self._write_checkpoint, checkpoint, metadata, save_path)
+        self._pending_save.add_done_callback(self._log_save_failure)
+    
+    def _build_checkpoint(self):
+        """
+        在主线程上生成检查点快照
+
+        状态先拷贝到CPU，后台线程序列化期间训练可以继续更新参数
+
+        Returns:
+            (checkpoint, metadata)
+        """
+        checkpoint = {
+            'model_state_dict': clone_to_cpu(self.raw_model.state_dict()),
+            'optimizer_state_dict': clone_to_cpu(self.optimizer.state_dict()),
+            **self._ckpt_static
+        }
+
+        metadata = convert_to_native({
             'train_losses': self.train_losses,
             'val_losses': self.val_losses,
             'best_val_loss': self.best_val_loss,
             'history': self.history,
-            'feature_columns': FEATURE_COLUMNS,
-            'normalization_params': {
-                'lat_min': -90.0,
-                'lat_max': 90.0,
-                'lon_min': -180.0,
-                'lon_max': 180.0,
-                'pressure_mean': 1000.0,
-                'pressure_std': 50.0,
-                'wind_mean': 20.0,
-                'wind_std': 15.0,
-            }
-        }, save_path)
+        })
+        return checkpoint, metadata
+    
+    def wait_for_pending_save(self):
+        """
+        等待正在进行的后台保存完成，写入失败时在主线程抛出异常
+
+        save_model 提交新任务前都会先调用本方法，因此每一次保存的结果都会被检查
+        """
+        if self._pending_save is not None:
+            pending, self._pending_save = self._pending_save, None
+            pending.result()
+    
+    @staticmethod
+    def _log_save_failure(future):
+        """后台保存失败时立即记录日志，不必等到主线程检查结果"""
+        error = future.exception()
+        if error is not None:
+            logger.error(f"模型保存失败: {error}")
+    
+    @staticmethod
+    def _write_checkpoint(checkpoint, metadata, save_path):
+        """写入临时文件后原子重命名，避免中断时留下不完整的检查点"""
+        tmp_path = save_path.with_name(save_path.name + '.tmp')
+        torch.save(checkpoint, tmp_path, _use_new_zipfile_serialization=True)
+        os.replace(tmp_path, save_path)
+        
+        metadata_path = save_path.with_suffix('.json')
+        tmp_metadata_path = metadata_path.with_name(metadata_path.name + '.tmp')
+        write_json(metadata, tmp_metadata_path)
+        os.replace(tmp_metadata_path, metadata_path)
         logger.info(f"模型已保存到: {save_path}")
     
     def save_history(self):
         """保存训练历史"""
         history_path = self.save_dir / 'training_history.json'
-        # 转换numpy类型为Python原生类型
-        def convert_to_native(obj):
-            if isinstance(obj, dict):
-                return {k: convert_to_native(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_to_native(item) for item in obj]
-            elif isinstance(obj, (np.integer, np.floating)):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            return obj
-        
-        history_native = convert_to_native(self.history)
-        with open(history_path, 'w', encoding='utf-8') as f:
-            json.dump(history_native, f, indent=2, ensure_ascii=False)
+        write_json(self.history, history_path, indent=True)
         logger.info(f"训练历史已保存到: {history_path}")
 
 
+def clone_to_cpu(obj):
+    """递归复制 state_dict 中的张量到CPU"""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    elif isinstance(obj, dict):
+        return {k: clone_to_cpu(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clone_to_cpu(item) for item in obj]
+    return obj
+
+
+def convert_to_native(obj):
+    """转换numpy类型为Python原生类型"""
+    if isinstance(obj, dict):
+        return {k: convert_to_native(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_to_native(item) for item in obj]
+    elif isinstance(obj, (np.integer, np.floating)):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return obj
+
+
+def write_json(obj, path, indent=False):
+    """写入JSON文件，优先使用 orjson（原生序列化numpy类型，无需逐元素转换）"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        Path(path).write_bytes(orjson.dumps(obj, option=option))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(convert_to_native(obj), f, indent=2 if indent else None, ensure_ascii=False)
+
+
 def main():
     parser = argparse.ArgumentParser(description='台风预测模型训练 V3 - 修复版本')
-    parser.add_argument('--csv-path', type=str, default=None)
-    parser.add_argument('--start-year', type=int, default=2000)
-    parser.add_argument('--end-year', type=int, default=2020)
-    parser.add_argument('--sequence-length', type=int, default=12)
-    parser.add_argument('--prediction-steps', type=int, default=8)
-    parser.add_argument('--batch-size', type=int, default=64)
-    parser.add_argument('--epochs', type=int, default=100)
-    parser.add_argument('--lr', type=float, default=0.001)
-    parser.add_argument('--weight-decay', type=float, default=1e-5)
-    parser.add_argument('--device', type=str, default='cuda')
-    parser.add_argument('--save-dir', type=str, default='./models')
-    parser.add_argument('--val-split', type=float, default=0.2)
+    add_common_args(parser)
     parser.add_argument('--early-stopping', type=int, default=15)
+    parser.add_argument('--grad-accum', '--accum-steps', dest='grad_accum', type=int, default=1,
+                        help='梯度累积步数，有效批次大小为 batch-size × grad-accum')
+    parser.add_argument('--cuda-graph', action='store_true', help='将模型前向+反向捕获为CUDA Graph（仅CUDA）')
+    parser.add_argument('--progress', action='store_true', help='使用tqdm进度条显示训练进度（默认按批次间隔记录日志）')
     
     args = parser.parse_args()
     
@@ -411,69 +686,19 @@ def main():
     device = torch.device(args.device if torch.cuda.is_available() else 'cpu')
     logger.info(f"使用设备: {device}")
     
+    # 允许剩余的 FP32 矩阵乘法和 cuDNN 卷积/RNN 使用 TF32
+    torch.set_float32_matmul_precision('high')
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    # 输入形状固定，让 cuDNN 首次运行时为 LSTM 等算子挑选最快的算法并缓存
+    torch.backends.cudnn.benchmark = True
+    
     try:
-        # 加载数据
-        logger.info("\n加载数据集...")
-        full_dataset = CSVTyphoonDataset(
-            csv_path=args.csv_path,
-            sequence_length=args.sequence_length,
-            prediction_steps=args.prediction_steps,
-            start_year=args.start_year,
-            end_year=args.end_year
-        )
-        
-        logger.info(f"数据集大小: {len(full_dataset)} 个样本")
-        
-        if len(full_dataset) == 0:
-            logger.error("数据集为空")
+        train_loader, val_loader = build_loaders(args, device)
+        if train_loader is None:
             return
         
-        # 划分数据集
-        val_size = int(len(full_dataset) * args.val_split)
-        train_size = len(full_dataset) - val_size
-        
-        train_dataset, val_dataset = random_split(
-            full_dataset,
-            [train_size, val_size],
-            generator=torch.Generator().manual_seed(42)
-        )
-        
-        logger.info(f"训练集: {len(train_dataset)}, 验证集: {len(val_dataset)}")
-        
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=args.batch_size,
-            shuffle=True,
-            collate_fn=TyphoonDataCollator(),
-            num_workers=0
-        )
-        
-        val_loader = DataLoader(
-            val_dataset,
-            batch_size=args.batch_size,
-            shuffle=False,
-            collate_fn=TyphoonDataCollator(),
-            num_workers=0
-        )
-        
-        # 初始化模型
-        logger.info("\n初始化模型...")
-        model = TransformerLSTMModel(
-            input_size=14,  # 14维特征
-            hidden_size=256,
-            num_lstm_layers=2,
-            num_transformer_layers=2,
-            num_heads=8,
-            output_size=4,
-            prediction_steps=args.prediction_steps,
-            dropout=0.2
-        )
-        
-        # 统计模型参数量
-        total_params = sum(p.numel() for p in model.parameters())
-        trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
-        logger.info(f"模型总参数量: {total_params:,}")
-        logger.info(f"可训练参数量: {trainable_params:,}")
+        model, optimizer, scheduler = build_model_and_optim(args, device)
         
         criterion = EnhancedLoss(
             path_weight=1.0,
@@ -482,20 +707,11 @@ def main():
             temporal_weight=0.2,
             confidence_weight=0.5
         )
-        
-        optimizer = torch.optim.AdamW(
-            model.parameters(),
-            lr=args.lr,
-            weight_decay=args.weight_decay
-        )
-        
-        scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
-            optimizer,
-            mode='min',
-            factor=0.5,
-            patience=5,
-            verbose=True
-        )
+        # 脚本化损失函数，让 TorchScript 融合物理约束、时序平滑等逐元素运算；失败时回退到 eager 模式
+        try:
+            criterion = torch.jit.script(criterion)
+        except Exception as e:
+            logger.warning(f"损失函数脚本化失败，使用 eager 模式: {e}")
         
         trainer = Trainer(
             model=model,
@@ -506,9 +722,15 @@ def main():
             scheduler=scheduler,
             device=str(device),
             save_dir=args.save_dir,
-            early_stopping_patience=args.early_stopping
+            early_stopping_patience=args.early_stopping,
+            cuda_graph=args.cuda_graph,
+            grad_accum=args.grad_accum,
+            progress=args.progress
         )
         
+        if trainer.use_amp:
+            logger.info(f"混合精度训练: {trainer.amp_dtype}, 损失缩放: {'开启' if trainer.scaler.is_enabled() else '关闭'}")
+        
         # 开始训练
         logger.info("\n开始训练...")
         trainer.train(num_epochs=args.epochs)
@@ -523,4 +745,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # 多进程数据加载时通过文件系统共享张量，避免文件描述符耗尽
+    torch.multiprocessing.set_sharing_strategy('file_system')
     main()
\ No newline at end of file